@@ -1,495 +1,1211 @@
-import openai
-import os
-from dotenv import load_dotenv
-from collections import deque
-from typing import List, Dict, Tuple, Optional
-import json
-import time
-import logging
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-class AgenticLLM:
-    """
-    Lightweight agentic LLM system that processes user input, determines intent,
-    and returns appropriate responses using OpenAI's GPT models.
-    """
-    
-    def __init__(self, model: str = "gpt-4o", memory_size: int = 3):
-        """
-        Initialize the agentic LLM system.
-        
-        Args:
-            model: OpenAI model to use (default: gpt-3.5-turbo)
-            memory_size: Number of interactions to keep in memory (default: 3)
-        """
-        # Load environment variables
-        load_dotenv()
-        
-        # Initialize OpenAI client
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        self.client = openai.OpenAI(api_key=api_key)
-        self.model = model
-        
-        # Memory management - store last N interactions
-        self.memory = deque(maxlen=memory_size)
-        
-        # Intent classification system prompt
-        self.intent_system_prompt = """You are an intent classifier. Your job is to classify user input as either 'factual' or 'creative'.
-
-Factual queries include:
-- Questions asking for specific information, facts, or data
-- Requests for explanations or definitions
-- "Who is...", "What is...", "When did...", "How many..." type questions
-- Technical or academic questions
-
-Creative prompts include:
-- Requests to generate stories, poems, or creative writing
-- Requests for captions, taglines, or creative descriptions
-- "Write a...", "Create a...", "Generate a..." for creative content
-- Brainstorming or imaginative requests
-
-Respond with only 'factual' or 'creative'."""
-
-        # Response generation prompts
-        self.factual_system_prompt = """You are a knowledgeable assistant that provides accurate, concise answers to factual questions. 
-Focus on being informative, precise, and helpful. Use the conversation context when relevant."""
-
-        self.creative_system_prompt = """You are a creative assistant that generates imaginative and engaging content.
-Be creative, original, and engaging while staying appropriate. Use the conversation context when relevant."""
-
-    def _get_context_string(self) -> str:
-        """Format conversation memory into a context string."""
-        if not self.memory:
-            return "No previous conversation."
-        
-        context_lines = []
-        for interaction in self.memory:
-            context_lines.append(f"User: {interaction['user_input']}")
-            context_lines.append(f"Assistant: {interaction['response']}")
-        
-        return "\n".join(context_lines[-6:])  # Last 6 lines (3 interactions)
-
-    def _detect_intent(self, user_input: str) -> str:
-        """
-        Detect whether the input is a factual query or creative prompt.
-        
-        Args:
-            user_input: The user's input text
-            
-        Returns:
-            'factual' or 'creative'
-        """
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.intent_system_prompt},
-                    {"role": "user", "content": f"Classify this input: '{user_input}'"}
-                ],
-                temperature=0.1,
-                max_tokens=10
-            )
-            
-            intent = response.choices[0].message.content.strip().lower()
-            
-            # Validate response
-            if intent not in ['factual', 'creative']:
-                logger.warning(f"Unexpected intent classification: {intent}. Defaulting to 'factual'")
-                return 'factual'
-                
-            return intent
-            
-        except Exception as e:
-            logger.error(f"Error in intent detection: {e}")
-            return 'factual'  # Safe default
-
-    def _generate_factual_response(self, user_input: str) -> str:
-        """
-        Generate response for factual queries.
-        
-        Args:
-            user_input: The user's factual question
-            
-        Returns:
-            Factual response string
-        """
-        context = self._get_context_string()
-        
-        user_message = f"""Context from previous conversation:
-{context}
-
-Current question: {user_input}
-
-Please provide a direct, factual answer."""
-
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.factual_system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.2,
-                max_tokens=250
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            logger.error(f"Error generating factual response: {e}")
-            return f"I apologize, but I encountered an error while processing your question. Please try again."
-
-    def _generate_creative_response(self, user_input: str) -> str:
-        """
-        Generate response for creative prompts.
-        
-        Args:
-            user_input: The user's creative prompt
-            
-        Returns:
-            Creative response string
-        """
-        context = self._get_context_string()
-        
-        user_message = f"""Context from previous conversation:
-{context}
-
-Current creative request: {user_input}
-
-Please generate creative content based on this request."""
-
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.creative_system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.8,
-                max_tokens=250
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            logger.error(f"Error generating creative response: {e}")
-            return f"I apologize, but I encountered an error while generating creative content. Please try again."
-
-    def _store_interaction(self, user_input: str, response: str, intent: str):
-        """
-        Store interaction in memory.
-        
-        Args:
-            user_input: User's input
-            response: Assistant's response
-            intent: Detected intent ('factual' or 'creative')
-        """
-        interaction = {
-            'user_input': user_input,
-            'response': response,
-            'intent': intent,
-            'timestamp': time.time()
-        }
-        self.memory.append(interaction)
-
-    def process_input(self, user_input: str) -> Dict[str, str]:
-        """
-        Main method to process user input and return appropriate response.
-        
-        Args:
-            user_input: The user's input text
-            
-        Returns:
-            Dictionary containing user_input, intent, and response
-        """
-        if not user_input or not user_input.strip():
-            return {
-                'user_input': user_input,
-                'intent': 'unknown',
-                'response': 'Please provide a valid input.'
-            }
-        
-        user_input = user_input.strip()
-        
-        # Step 1: Detect intent
-        logger.info(f"Processing input: {user_input[:50]}...")
-        intent = self._detect_intent(user_input)
-        logger.info(f"Detected intent: {intent}")
-        
-        # Step 2: Generate appropriate response
-        if intent == 'creative':
-            response = self._generate_creative_response(user_input)
-        else:  # factual
-            response = self._generate_factual_response(user_input)
-        
-        # Step 3: Store interaction in memory
-        self._store_interaction(user_input, response, intent)
-        
-        return {
-            'user_input': user_input,
-            'intent': intent,
-            'response': response
-        }
-
-    def get_memory_summary(self) -> List[Dict]:
-        """Get current memory state."""
-        return list(self.memory)
-
-    def clear_memory(self):
-        """Clear conversation memory."""
-        self.memory.clear()
-        logger.info("Memory cleared")
-
-    def get_memory_stats(self) -> Dict:
-        """Get statistics about memory usage."""
-        if not self.memory:
-            return {'total_interactions': 0, 'factual_count': 0, 'creative_count': 0}
-        
-        factual_count = sum(1 for interaction in self.memory if interaction['intent'] == 'factual')
-        creative_count = sum(1 for interaction in self.memory if interaction['intent'] == 'creative')
-        
-        return {
-            'total_interactions': len(self.memory),
-            'factual_count': factual_count,
-            'creative_count': creative_count,
-            'memory_capacity': self.memory.maxlen
-        }
-
-
-def run_comprehensive_tests():
-    """Run comprehensive test cases covering various scenarios."""
-    print("=== AGENTIC LLM SYSTEM - COMPREHENSIVE TESTING ===\n")
-    
-    agent = AgenticLLM()
-    
-    test_cases = [
-        # === FACTUAL QUERIES ===
-        {
-            'category': 'Factual - Basic Facts',
-            'inputs': [
-                "Who is the CEO of Google?",
-                "What is the capital of France?",
-                "How many continents are there?",
-                "What year was Python programming language created?",
-                "What is the speed of light?"
-            ]
-        },
-        {
-            'category': 'Factual - Definitions',
-            'inputs': [
-                "What is machine learning?",
-                "Define photosynthesis",
-                "What does API stand for?",
-                "Explain what blockchain is"
-            ]
-        },
-        {
-            'category': 'Factual - Historical',
-            'inputs': [
-                "When did World War II end?",
-                "Who invented the telephone?",
-                "What year was the internet created?"
-            ]
-        },
-        
-        # === CREATIVE PROMPTS ===
-        {
-            'category': 'Creative - Captions & Descriptions',
-            'inputs': [
-                "Give me a caption for a futuristic city",
-                "Describe a magical forest in two sentences",
-                "Create a tagline for an eco-friendly coffee shop",
-                "Write a caption for a sunset over mountains"
-            ]
-        },
-        {
-            'category': 'Creative - Stories & Poems',
-            'inputs': [
-                "Write a short poem about rain",
-                "Create a story about a time-traveling cat",
-                "Write a haiku about technology",
-                "Tell me a story about a robot learning to paint"
-            ]
-        },
-        {
-            'category': 'Creative - Brainstorming',
-            'inputs': [
-                "Generate 3 names for a space exploration company",
-                "Create a concept for a mobile app that helps with meditation",
-                "Invent a new ice cream flavor and describe it"
-            ]
-        },
-        
-        # === EDGE CASES ===
-        {
-            'category': 'Edge Cases',
-            'inputs': [
-                "Hello",
-                "Help",
-                "?",
-                "What do you think about AI and creativity?",
-                "Can you both explain quantum physics and write a poem about it?"
-            ]
-        },
-        
-        # === MEMORY/CONTEXT TESTING ===
-        {
-            'category': 'Memory & Context Testing',
-            'inputs': [
-                "Tell me about Albert Einstein",
-                "What did he discover?",  # Should reference Einstein
-                "When was he born?",     # Should still reference Einstein
-                "Now tell me about Marie Curie",
-                "What was her most famous discovery?"  # Should reference Curie
-            ]
-        }
-    ]
-    
-    # Run all test cases
-    for test_group in test_cases:
-        print(f"\n{'='*60}")
-        print(f"TESTING: {test_group['category']}")
-        print('='*60)
-        
-        for i, test_input in enumerate(test_group['inputs'], 1):
-            print(f"\nTest {i}: {test_input}")
-            print("-" * 40)
-            
-            result = agent.process_input(test_input)
-            print(f"Intent: {result['intent'].upper()}")
-            print(f"Response: {result['response']}")
-            
-            # Brief pause to avoid rate limiting
-            time.sleep(0.8)
-    
-    # Show final memory state and statistics
-    print(f"\n{'='*60}")
-    print("FINAL MEMORY STATE & STATISTICS")
-    print('='*60)
-    
-    stats = agent.get_memory_stats()
-    print(f"Memory Statistics:")
-    print(f"  Total interactions: {stats['total_interactions']}")
-    print(f"  Factual queries: {stats['factual_count']}")
-    print(f"  Creative prompts: {stats['creative_count']}")
-    print(f"  Memory capacity: {stats['memory_capacity']}")
-    
-    print(f"\nLast {len(agent.memory)} interactions in memory:")
-    memory = agent.get_memory_summary()
-    for i, interaction in enumerate(memory, 1):
-        print(f"{i}. [{interaction['intent'].upper()}] {interaction['user_input']}")
-        print(f"   → {interaction['response'][:80]}{'...' if len(interaction['response']) > 80 else ''}")
-
-
-def interactive_mode():
-    """Run interactive mode for manual testing and demonstration."""
-    print("=== AGENTIC LLM SYSTEM - INTERACTIVE MODE ===")
-    print("Commands:")
-    print("  'exit' - Quit the program")
-    print("  'memory' - Show conversation history")
-    print("  'stats' - Show memory statistics")
-    print("  'clear' - Clear conversation memory")
-    print("  'help' - Show this help message")
-    print("\nStart chatting!\n")
-    
-    agent = AgenticLLM()
-    
-    while True:
-        try:
-            user_input = input("You: ").strip()
-            
-            if user_input.lower() == 'exit':
-                print("Goodbye!")
-                break
-            elif user_input.lower() == 'memory':
-                memory = agent.get_memory_summary()
-                print(f"\n--- Conversation History ({len(memory)} interactions) ---")
-                if not memory:
-                    print("No interactions yet.")
-                else:
-                    for i, interaction in enumerate(memory, 1):
-                        print(f"{i}. You [{interaction['intent']}]: {interaction['user_input']}")
-                        print(f"   Assistant: {interaction['response'][:100]}{'...' if len(interaction['response']) > 100 else ''}")
-                print()
-                continue
-            elif user_input.lower() == 'stats':
-                stats = agent.get_memory_stats()
-                print(f"\n--- Memory Statistics ---")
-                print(f"Total interactions: {stats['total_interactions']}")
-                print(f"Factual queries: {stats['factual_count']}")
-                print(f"Creative prompts: {stats['creative_count']}")
-                print(f"Memory capacity: {stats['memory_capacity']}")
-                print()
-                continue
-            elif user_input.lower() == 'clear':
-                agent.clear_memory()
-                print("Conversation memory cleared.\n")
-                continue
-            elif user_input.lower() == 'help':
-                print("\nCommands:")
-                print("  'exit' - Quit the program")
-                print("  'memory' - Show conversation history")
-                print("  'stats' - Show memory statistics")
-                print("  'clear' - Clear conversation memory")
-                print("  'help' - Show this help message\n")
-                continue
-            elif not user_input:
-                continue
-            
-            # Process the input
-            result = agent.process_input(user_input)
-            print(f"Agent [{result['intent']}]: {result['response']}\n")
-            
-        except KeyboardInterrupt:
-            print("\n\nGoodbye!")
-            break
-        except Exception as e:
-            print(f"Error: {e}")
-
-
-if __name__ == "__main__":
-    # Verify OpenAI API key
-    load_dotenv()
-    if not os.getenv('OPENAI_API_KEY'):
-        print("❌ Error: OPENAI_API_KEY not found in environment variables.")
-        print("Please add your OpenAI API key to a .env file:")
-        print("OPENAI_API_KEY=your_api_key_here")
-        exit(1)
-    
-    print("🤖 AGENTIC LLM SYSTEM")
-    print("Choose a mode:")
-    print("1. Run comprehensive automated tests")
-    print("2. Interactive mode (chat with the agent)")
-    print("3. Quick demo")
-    
-    choice = input("\nEnter your choice (1, 2, or 3): ").strip()
-    
-    if choice == '1':
-        run_comprehensive_tests()
-    elif choice == '2':
-        interactive_mode()
-    elif choice == '3':
-        # Quick demo
-        print("\n=== QUICK DEMO ===")
-        agent = AgenticLLM()
-        
-        demo_inputs = [
-            "Who is the CEO of Google?",
-            "Give me a caption for a futuristic city",
-            "What's the largest planet in our solar system?",
-            "Write a short poem about coding"
-        ]
-        
-        for inp in demo_inputs:
-            print(f"\nUser: {inp}")
-            result = agent.process_input(inp)
-            print(f"Agent [{result['intent']}]: {result['response']}")
-    else:
-        print("Invalid choice. Running comprehensive tests by default.")
-        run_comprehensive_tests()
\ No newline at end of file
+import aiohttp
+import asyncio
+import openai
+import orjson
+import os
+import re
+import sqlite3
+import string
+import sys
+import threading
+import tiktoken
+from aiolimiter import AsyncLimiter
+from dotenv import load_dotenv
+from collections import deque, OrderedDict
+from openai import APIConnectionError, APITimeoutError, RateLimitError
+from tenacity import retry, retry_if_exception, retry_if_exception_type, stop_after_attempt, wait_exponential
+from typing import Callable, List, Dict, Tuple, Optional
+import json
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fast intent pre-classifier patterns - compiled once at import so hot
+# methods never pay re.compile's internal cache lookup
+_CREATIVE_RE = re.compile(
+    r'^(write|create|generate|invent|compose|draft|brainstorm)\b'
+    r'|\b(poem|haiku|story|caption|tagline)\b',
+    re.I
+)
+_FACTUAL_RE = re.compile(
+    r'^(who|what|when|where|how many|define|explain)\b',
+    re.I
+)
+
+# Intent cache sizing - entries older than the TTL expire, and the cache
+# evicts least-recently-used entries beyond the max size
+_INTENT_CACHE_TTL = 3600.0
+_INTENT_CACHE_MAXSIZE = 1024
+
+# Minimum seconds between follow-up prefetch rounds
+_PREFETCH_MIN_INTERVAL = 0.5
+
+# Transient API errors worth retrying with backoff; anything else is
+# terminal and surfaces to the per-method error handling
+_RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError)
+
+
+def _is_retryable_http_error(exc: BaseException) -> bool:
+    """Retry 429/5xx responses and connection-level errors; other 4xx fail fast."""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, aiohttp.ClientError)
+
+# Process-wide OpenAI client so connection pools and TLS sessions are
+# reused across AgenticLLM instances instead of re-handshaking
+_SHARED_CLIENT: Optional[openai.AsyncOpenAI] = None
+_SHARED_CLIENT_KEY: Optional[str] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _get_client(api_key: str) -> openai.AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _SHARED_CLIENT, _SHARED_CLIENT_KEY
+    with _CLIENT_LOCK:
+        if _SHARED_CLIENT is None or _SHARED_CLIENT_KEY != api_key:
+            # max_retries=0: tenacity in _chat_create is the single retry
+            # policy - the SDK's internal retries would stack under it
+            _SHARED_CLIENT = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+            _SHARED_CLIENT_KEY = api_key
+        return _SHARED_CLIENT
+
+# Token budgets for memory context injected into prompts
+_SNIPPET_MAX_TOKENS = 100
+_CONTEXT_BUDGET_TOKENS = 400
+
+# Default on-disk location for persisted conversation memory
+_DEFAULT_DB_PATH = "agentic_memory.db"
+
+
+# Single-pass normalization table: drops punctuation and lowercases ASCII
+# in one C-level str.translate call
+_NORMALIZE_TABLE = str.maketrans({**{c: None for c in string.punctuation},
+                                  **{c: c.lower() for c in string.ascii_uppercase}})
+
+
+def _normalize(s: str) -> str:
+    """Normalize input for cache keying: lowercase, strip punctuation, collapse whitespace."""
+    # split()+join collapses whitespace without regex engine overhead
+    return " ".join(s.translate(_NORMALIZE_TABLE).split())
+
+class AgenticLLM:
+    """
+    Lightweight agentic LLM system that processes user input, determines intent,
+    and returns appropriate responses using OpenAI's GPT models.
+    """
+    
+    def __init__(self, model: str = "gpt-4o", memory_size: int = 3,
+                 classifier_model: str = "gpt-4o-mini",
+                 use_raw_transport: bool = False,
+                 session_id: str = "default", db_path: str = _DEFAULT_DB_PATH,
+                 rpm: int = 500):
+        """
+        Initialize the agentic LLM system.
+
+        Args:
+            model: OpenAI model to use (default: gpt-3.5-turbo)
+            memory_size: Number of interactions to keep in memory (default: 3)
+            classifier_model: Cheaper model for single-word intent
+                classification and follow-up prediction - these tasks do not
+                need the main model (default: gpt-4o-mini)
+            use_raw_transport: POST to /v1/chat/completions with a pooled
+                aiohttp session instead of the SDK - higher throughput
+                under concurrent load (default: False)
+            session_id: Persistence session - memory from a previous run of
+                the same session is rehydrated without any LLM calls
+            db_path: SQLite file backing conversation memory
+            rpm: Requests-per-minute budget for the token-bucket rate
+                limiter - size this to your OpenAI tier (default: 500)
+        """
+        # Load environment variables
+        load_dotenv()
+        
+        # Initialize OpenAI client
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        
+        self.client = _get_client(api_key)
+        self.model = model
+        self.classifier_model = classifier_model
+
+        # Raw aiohttp transport - session is created lazily inside a running
+        # event loop and reused across calls
+        self.api_key = api_key
+        self.use_raw_transport = use_raw_transport
+        self._aiohttp_session: Optional[aiohttp.ClientSession] = None
+
+        # Token-bucket rate limiter - yields immediately while the bucket
+        # has capacity and throttles only near the actual rate limit
+        self.rpm = rpm
+        self._limiter = AsyncLimiter(max_rate=rpm, time_period=60)
+        
+        # Memory management - last N interactions as parallel arrays (SoA)
+        # with incrementally-maintained intent counters for O(1) stats
+        self._ids: deque = deque(maxlen=memory_size)
+        self._inputs: deque = deque(maxlen=memory_size)
+        self._responses: deque = deque(maxlen=memory_size)
+        self._context_snippets: deque = deque(maxlen=memory_size)
+        self._intents: deque = deque(maxlen=memory_size)
+        self._timestamps: deque = deque(maxlen=memory_size)
+        self._factual_count = 0
+        self._creative_count = 0
+        # Plain int interaction count - a C-level compare on the hot paths
+        # instead of deque truthiness protocol
+        self._n = 0
+
+        # Incrementally-maintained context lines (2 lines per interaction),
+        # so the memory pack never rebuilds from scratch
+        self._context_lines: deque = deque(maxlen=2 * memory_size)
+        self._context_line_tokens: deque = deque(maxlen=2 * memory_size)
+
+        # Tokenizer for budgeting the context injected into prompts
+        try:
+            self._encoding = tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+
+        # Memory pack versioning for provider-side prompt-prefix caching:
+        # the serialized pack is recomputed only when memory mutates
+        self._interaction_seq = 0
+        self._memory_version = 0
+        self._memory_pack_cache: Optional[Tuple[int, str]] = None
+
+        # Persist interactions to SQLite (WAL) so memory survives process
+        # restarts and can be rehydrated without re-warming via LLM calls
+        self.session_id = session_id
+        self._db = sqlite3.connect(db_path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS interactions (
+                id INTEGER PRIMARY KEY,
+                session TEXT,
+                user_input TEXT,
+                response TEXT,
+                intent TEXT,
+                ts REAL
+            )
+        """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_interactions_session ON interactions (session, id DESC)"
+        )
+        
+        # Combined classification + response system prompt (single LLM call)
+        self.combined_system_prompt = """You are an assistant that first classifies user input and then responds to it in one step.
+
+Classify the input as either 'factual' or 'creative':
+
+Factual queries include:
+- Questions asking for specific information, facts, or data
+- Requests for explanations or definitions
+- "Who is...", "What is...", "When did...", "How many..." type questions
+- Technical or academic questions
+
+Creative prompts include:
+- Requests to generate stories, poems, or creative writing
+- Requests for captions, taglines, or creative descriptions
+- "Write a...", "Create a...", "Generate a..." for creative content
+- Brainstorming or imaginative requests
+
+Then generate the response according to the classification:
+- If factual: be accurate, concise, and informative.
+- If creative: be imaginative, original, and engaging while staying appropriate.
+
+Use the conversation context when relevant."""
+
+        # Single-word classification prompt, used when classifying predicted
+        # follow-up questions in the background
+        self.intent_system_prompt = """You are an intent classifier. Classify user input as either 'factual' (questions asking for facts, data, definitions, or explanations) or 'creative' (requests for stories, poems, captions, taglines, or brainstorming).
+
+Respond with only 'factual' or 'creative'."""
+
+        # Per-intent prompts used when the pattern pre-classifier already
+        # resolved the intent and no classification step is needed
+        self.intent_system_prompts = {
+            'factual': """You are a knowledgeable assistant that provides accurate, concise answers to factual questions.
+Focus on being informative, precise, and helpful. Use the conversation context when relevant.""",
+            'creative': """You are a creative assistant that generates imaginative and engaging content.
+Be creative, original, and engaging while staying appropriate. Use the conversation context when relevant."""
+        }
+        self.intent_temperatures = {'factual': 0.2, 'creative': 0.8}
+
+        # Pre-rendered system-message templates - only the memory pack
+        # varies per call, so assemble the static parts once
+        self._system_tmpls = {
+            'factual': self.intent_system_prompts['factual'] + "\n\n<memory>\n{ctx}\n</memory>",
+            'creative': self.intent_system_prompts['creative'] + "\n\n<memory>\n{ctx}\n</memory>",
+            'combined': self.combined_system_prompt + "\n\n<memory>\n{ctx}\n</memory>"
+        }
+
+        # Pre-classifier hit/miss counters for tracking the LLM skip rate
+        self._pattern_hits = 0
+        self._pattern_misses = 0
+
+        # LRU+TTL cache of LLM intent classifications, keyed by normalized input
+        self._intent_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._intent_cache_hits = 0
+        self._intent_cache_misses = 0
+
+        # Follow-up prefetch state - pending tasks are held here so they
+        # aren't garbage-collected mid-flight
+        self._prefetch_tasks: set = set()
+        self._last_prefetch_ts = 0.0
+
+        # Resume the session's conversation from disk, if any
+        self.warmup_from_db()
+
+        # JSON schema enforcing {"intent": ..., "response": ...} output
+        self.response_schema = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "agent_reply",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "intent": {"type": "string", "enum": ["factual", "creative"]},
+                        "response": {"type": "string"}
+                    },
+                    "required": ["intent", "response"],
+                    "additionalProperties": False
+                }
+            }
+        }
+
+    @retry(wait=wait_exponential(multiplier=0.5, max=8),
+           stop=stop_after_attempt(5),
+           retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+           reraise=True)
+    async def _chat_create(self, **kwargs):
+        """Rate-limited chat.completions.create with backoff on transient errors."""
+        async with self._limiter:
+            return await self.client.chat.completions.create(**kwargs)
+
+    @retry(wait=wait_exponential(multiplier=0.5, max=8),
+           stop=stop_after_attempt(5),
+           retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+           reraise=True)
+    async def _api_call(self, call, *args, **kwargs):
+        """Non-chat SDK call (files/batches) with backoff on transient errors."""
+        return await call(*args, **kwargs)
+
+    def _get_aiohttp_session(self) -> aiohttp.ClientSession:
+        """Lazily create the shared aiohttp session with a pooled connector."""
+        if self._aiohttp_session is None or self._aiohttp_session.closed:
+            self._aiohttp_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=100)
+            )
+        return self._aiohttp_session
+
+    @retry(wait=wait_exponential(multiplier=0.5, max=8),
+           stop=stop_after_attempt(5),
+           retry=retry_if_exception(_is_retryable_http_error),
+           reraise=True)
+    async def _raw_chat(self, messages: List[Dict[str, str]], temperature: float,
+                        max_tokens: int, response_format: Optional[Dict] = None) -> str:
+        """
+        POST directly to /v1/chat/completions, bypassing the SDK.
+
+        The SDK's httpx transport bottlenecks under heavy concurrency; a
+        reused aiohttp session with a pooled connector sustains higher QPS.
+
+        Args:
+            messages: Chat messages list
+            temperature: Sampling temperature
+            max_tokens: Response token cap
+            response_format: Optional response_format body field
+
+        Returns:
+            The response message content
+        """
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if response_format is not None:
+            body["response_format"] = response_format
+
+        session = self._get_aiohttp_session()
+        async with self._limiter, session.post(
+            "https://api.openai.com/v1/chat/completions",
+            data=orjson.dumps(body),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+        ) as resp:
+            resp.raise_for_status()
+            payload = orjson.loads(await resp.read())
+
+        return payload["choices"][0]["message"]["content"]
+
+    async def aclose(self):
+        """Cancel outstanding prefetch tasks and close the raw aiohttp session."""
+        for task in list(self._prefetch_tasks):
+            task.cancel()
+        if self._prefetch_tasks:
+            await asyncio.gather(*self._prefetch_tasks, return_exceptions=True)
+        self._prefetch_tasks.clear()
+
+        if self._aiohttp_session is not None and not self._aiohttp_session.closed:
+            await self._aiohttp_session.close()
+        self._aiohttp_session = None
+
+    def _truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """Truncate text to at most max_tokens tokens, marking any cut with '...'."""
+        tokens = self._encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return self._encoding.decode(tokens[:max_tokens]) + "..."
+
+    def _stable_memory_pack(self) -> str:
+        """
+        Deterministic serialization of conversation memory.
+
+        Context lines are kept in monotonic store order, so identical memory
+        states always serialize to byte-identical strings - this lets the
+        provider's prompt-prefix KV cache hit on the system message. The
+        joined pack is cached and recomputed only when memory mutates.
+        """
+        if self._n == 0:
+            return "No previous conversation."
+        if self._memory_pack_cache is None or self._memory_pack_cache[0] != self._memory_version:
+            pack = "\n".join(self._context_lines) or "No previous conversation."
+            self._memory_pack_cache = (self._memory_version, pack)
+        return self._memory_pack_cache[1]
+
+    def _detect_intent(self, user_input: str) -> Optional[str]:
+        """
+        Fast pattern-based intent pre-classifier.
+
+        Resolves obvious factual/creative inputs with compiled regexes, then
+        checks the LRU+TTL cache of previous LLM classifications. Inputs that
+        match neither return None and fall back to the combined LLM call.
+
+        Args:
+            user_input: The user's input text
+
+        Returns:
+            'factual', 'creative', or None if ambiguous
+        """
+        creative = bool(_CREATIVE_RE.search(user_input))
+        factual = bool(_FACTUAL_RE.search(user_input))
+
+        if creative != factual:
+            intent = 'creative' if creative else 'factual'
+            self._pattern_hits += 1
+            logger.debug(f"Pattern pre-classifier resolved intent '{intent}' "
+                         f"(hits={self._pattern_hits}, misses={self._pattern_misses})")
+            return intent
+
+        self._pattern_misses += 1
+
+        # Check the cache of previous LLM classifications
+        key = _normalize(user_input)
+        cached = self._intent_cache.get(key)
+        if cached is not None:
+            intent, stored_at = cached
+            if time.time() - stored_at < _INTENT_CACHE_TTL:
+                self._intent_cache.move_to_end(key)
+                self._intent_cache_hits += 1
+                logger.debug(f"Intent cache hit: '{intent}' "
+                             f"(hits={self._intent_cache_hits}, misses={self._intent_cache_misses})")
+                return intent
+            del self._intent_cache[key]  # Expired entry
+
+        self._intent_cache_misses += 1
+        logger.debug(f"Pattern pre-classifier ambiguous and intent cache miss, falling back to LLM "
+                     f"(hits={self._intent_cache_hits}, misses={self._intent_cache_misses})")
+        return None
+
+    def _cache_intent(self, user_input: str, intent: str):
+        """
+        Store an LLM-derived intent classification in the LRU+TTL cache.
+
+        Args:
+            user_input: The raw input the classification was made for
+            intent: 'factual' or 'creative'
+        """
+        key = _normalize(user_input)
+        self._intent_cache[key] = (intent, time.time())
+        self._intent_cache.move_to_end(key)
+        while len(self._intent_cache) > _INTENT_CACHE_MAXSIZE:
+            self._intent_cache.popitem(last=False)
+
+    async def _generate_response(self, user_input: str, intent: str,
+                                 on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Generate a response for an input whose intent is already known.
+
+        Args:
+            user_input: The user's input text
+            intent: 'factual' or 'creative'
+            on_token: Optional callback invoked with each streamed token as
+                it arrives, so callers can render output before the full
+                response completes
+
+        Returns:
+            Response string (always the complete text)
+        """
+        # Stable prefix (prompt + memory pack) leads; only the user turn varies
+        messages = [
+            {"role": "system", "content": self._system_tmpls[intent].format(ctx=self._stable_memory_pack())},
+            {"role": "user", "content": user_input}
+        ]
+
+        try:
+            if on_token is not None:
+                # Stream tokens as they arrive so the first token reaches the
+                # caller at first-token latency, not full-response latency
+                stream = await self._chat_create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.intent_temperatures[intent],
+                    max_tokens=250,
+                    stream=True
+                )
+                parts = []
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content or ""
+                    if delta:
+                        on_token(delta)
+                        parts.append(delta)
+                content = "".join(parts)
+            elif self.use_raw_transport:
+                content = await self._raw_chat(
+                    messages,
+                    temperature=self.intent_temperatures[intent],
+                    max_tokens=250
+                )
+            else:
+                response = await self._chat_create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.intent_temperatures[intent],
+                    max_tokens=250
+                )
+                content = response.choices[0].message.content
+
+            return content.strip()
+
+        except Exception as e:
+            logger.error(f"Error generating {intent} response: {e}")
+            return "I apologize, but I encountered an error while processing your input. Please try again."
+
+    async def _classify_and_respond(self, user_input: str) -> Tuple[Optional[str], str]:
+        """
+        Classify intent and generate the response in a single LLM call.
+
+        Args:
+            user_input: The user's input text
+
+        Returns:
+            Tuple of (intent, response) where intent is 'factual' or
+            'creative', or None if the call failed or the classification
+            could not be trusted - callers must not cache a None intent
+        """
+        # Stable prefix (prompt + memory pack) leads; only the user turn varies
+        messages = [
+            {"role": "system", "content": self._system_tmpls['combined'].format(ctx=self._stable_memory_pack())},
+            {"role": "user", "content": user_input}
+        ]
+
+        try:
+            if self.use_raw_transport:
+                content = await self._raw_chat(
+                    messages,
+                    temperature=0.5,
+                    max_tokens=300,
+                    response_format=self.response_schema
+                )
+            else:
+                response = await self._chat_create(
+                    model=self.model,
+                    messages=messages,
+                    response_format=self.response_schema,
+                    temperature=0.5,
+                    max_tokens=300
+                )
+                content = response.choices[0].message.content
+
+            result = json.loads(content)
+            intent = result.get('intent', '').strip().lower()
+
+            # Validate response - an unexpected label still carries a usable
+            # response, but the classification itself is suspect
+            if intent not in ['factual', 'creative']:
+                logger.warning(f"Unexpected intent classification: {intent}")
+                return None, result.get('response', '').strip()
+
+            return intent, result.get('response', '').strip()
+
+        except Exception as e:
+            logger.error(f"Error in classification/response generation: {e}")
+            return None, "I apologize, but I encountered an error while processing your input. Please try again."
+
+    async def _classify_intent_llm(self, user_input: str) -> Optional[str]:
+        """
+        Classify intent with a dedicated single-word LLM call.
+
+        Args:
+            user_input: The input text to classify
+
+        Returns:
+            'factual', 'creative', or None if classification failed
+        """
+        try:
+            response = await self._chat_create(
+                model=self.classifier_model,
+                messages=[
+                    {"role": "system", "content": self.intent_system_prompt},
+                    {"role": "user", "content": f"Classify this input: '{user_input}'"}
+                ],
+                temperature=0.1,
+                max_tokens=10
+            )
+
+            intent = response.choices[0].message.content.strip().lower()
+            if intent in ['factual', 'creative']:
+                return intent
+            logger.debug(f"Unexpected intent classification: {intent}")
+
+        except Exception as e:
+            logger.debug(f"Error in intent classification: {e}")
+
+        return None
+
+    async def _prefetch_followups(self, user_input: str, response: str):
+        """
+        Predict likely follow-up questions and pre-classify their intents.
+
+        Runs in the background after a response is delivered, so the next
+        turn's intent detection resolves from the cache instead of the
+        network. Rate-limited by a minimum interval between rounds.
+
+        Args:
+            user_input: The user input just processed
+            response: The response just delivered
+        """
+        now = time.time()
+        if now - self._last_prefetch_ts < _PREFETCH_MIN_INTERVAL:
+            return
+        self._last_prefetch_ts = now
+
+        try:
+            prediction = await self._chat_create(
+                model=self.classifier_model,
+                messages=[
+                    {"role": "system", "content": "You predict likely follow-up questions in a conversation."},
+                    {"role": "user", "content": f"Given this exchange, list 3 likely follow-up questions, one per line, no numbering.\n\nUser: {user_input}\nAssistant: {response}"}
+                ],
+                temperature=0.3,
+                max_tokens=60
+            )
+            followups = [line.strip() for line in prediction.choices[0].message.content.splitlines() if line.strip()]
+        except Exception as e:
+            logger.debug(f"Follow-up prediction failed: {e}")
+            return
+
+        # Only classify predictions the pattern pre-classifier and cache
+        # would not already resolve; bind the patterns locally to skip
+        # repeated global lookups in the comprehension
+        creative_re, factual_re = _CREATIVE_RE, _FACTUAL_RE
+        pending = [
+            q for q in followups[:3]
+            if bool(creative_re.search(q)) == bool(factual_re.search(q))
+            and _normalize(q) not in self._intent_cache
+        ]
+        if not pending:
+            return
+
+        intents = await asyncio.gather(*(self._classify_intent_llm(q) for q in pending))
+        for question, intent in zip(pending, intents):
+            if intent is not None:
+                self._cache_intent(question, intent)
+        logger.debug(f"Prefetched intents for {sum(i is not None for i in intents)} predicted follow-ups")
+
+    async def run_batch(self, inputs: List[str], poll_interval: float = 10.0) -> List[Dict[str, str]]:
+        """
+        Process independent inputs through OpenAI's Batch API.
+
+        Batched requests cost 50% of live calls and draw from a separate
+        rate-limit pool, at the price of up to 24h turnaround. Inputs are
+        treated as independent (no conversation memory is used or updated).
+
+        Args:
+            inputs: List of user inputs to process
+            poll_interval: Seconds between batch status polls
+
+        Returns:
+            List of {'user_input', 'intent', 'response'} dicts, in input order
+        """
+        # Same stable-prefix layout as the live path, with empty memory
+        system_message = self._system_tmpls['combined'].format(ctx="No previous conversation.")
+
+        lines = []
+        for i, user_input in enumerate(inputs):
+            lines.append(orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": user_input}
+                    ],
+                    "response_format": self.response_schema,
+                    "temperature": 0.5,
+                    "max_tokens": 300
+                }
+            }))
+
+        # Upload from memory: a retried files.create must resend the full
+        # payload, which a consumed file handle cannot do
+        input_file = await self._api_call(
+            self.client.files.create,
+            file=("batch_input.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+
+        batch = await self._api_call(
+            self.client.batches.create,
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted batch {batch.id} with {len(inputs)} requests")
+
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            await asyncio.sleep(poll_interval)
+            batch = await self._api_call(self.client.batches.retrieve, batch.id)
+            logger.debug(f"Batch {batch.id} status: {batch.status}")
+
+        if batch.status != 'completed':
+            raise RuntimeError(f"Batch {batch.id} finished with status '{batch.status}'")
+
+        output = await self._api_call(self.client.files.content, batch.output_file_id)
+
+        # Map results back to input order via custom_id
+        results = [None] * len(inputs)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            entry = orjson.loads(line)
+            i = int(entry['custom_id'])
+            try:
+                content = entry['response']['body']['choices'][0]['message']['content']
+                parsed = json.loads(content)
+                intent = parsed.get('intent', 'factual')
+                response = parsed.get('response', '').strip()
+            except (KeyError, IndexError, TypeError, json.JSONDecodeError) as e:
+                logger.error(f"Error parsing batch result for input {i}: {e}")
+                intent, response = 'factual', "I apologize, but I encountered an error while processing your input. Please try again."
+            results[i] = {
+                'user_input': inputs[i],
+                'intent': intent,
+                'response': response
+            }
+
+        # Requests that failed server-side land in the error file and never
+        # reach the output file; log them and fill their slots with the
+        # canned error so a partial failure degrades instead of crashing
+        if batch.error_file_id:
+            try:
+                errors = await self._api_call(self.client.files.content, batch.error_file_id)
+                for line in errors.text.splitlines():
+                    if line.strip():
+                        logger.error(f"Batch request failed: {line.strip()}")
+            except Exception as e:
+                logger.error(f"Could not fetch batch error file {batch.error_file_id}: {e}")
+
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = {
+                    'user_input': inputs[i],
+                    'intent': 'factual',
+                    'response': "I apologize, but I encountered an error while processing your input. Please try again."
+                }
+
+        return results
+
+    def _append_memory(self, user_input: str, response: str, intent: str,
+                       timestamp: Optional[float] = None):
+        """
+        Append an interaction to in-memory state (deques, counters, context).
+
+        Args:
+            user_input: User's input
+            response: Assistant's response
+            intent: Detected intent ('factual' or 'creative')
+            timestamp: Interaction time (defaults to now)
+        """
+        # Full response is kept in memory; only a token-capped snippet is
+        # injected into future prompt context
+        context_snippet = self._truncate_tokens(response, _SNIPPET_MAX_TOKENS)
+
+        # Maintain the intent counters incrementally: when the deques are
+        # full, the oldest interaction is evicted by this append
+        if len(self._intents) == self._intents.maxlen:
+            if self._intents[0] == 'factual':
+                self._factual_count -= 1
+            elif self._intents[0] == 'creative':
+                self._creative_count -= 1
+        if intent == 'factual':
+            self._factual_count += 1
+        elif intent == 'creative':
+            self._creative_count += 1
+
+        self._ids.append(self._interaction_seq)
+        self._inputs.append(user_input)
+        self._responses.append(response)
+        self._context_snippets.append(context_snippet)
+        self._intents.append(intent)
+        self._timestamps.append(timestamp if timestamp is not None else time.time())
+        self._interaction_seq += 1
+        if self._n < self._intents.maxlen:
+            self._n += 1
+
+        for line in (f"User: {user_input}", f"Assistant: {context_snippet}"):
+            self._context_lines.append(line)
+            self._context_line_tokens.append(len(self._encoding.encode(line)))
+
+        # Drop oldest lines until the total context fits the token budget,
+        # always keeping the current interaction
+        while sum(self._context_line_tokens) > _CONTEXT_BUDGET_TOKENS and len(self._context_lines) > 2:
+            self._context_lines.popleft()
+            self._context_line_tokens.popleft()
+
+        self._memory_version += 1
+
+    def _store_interaction(self, user_input: str, response: str, intent: str):
+        """
+        Store interaction in memory and persist it to the session's DB row.
+
+        Args:
+            user_input: User's input
+            response: Assistant's response
+            intent: Detected intent ('factual' or 'creative')
+        """
+        self._append_memory(user_input, response, intent)
+        self._db.execute(
+            "INSERT INTO interactions (session, user_input, response, intent, ts) VALUES (?, ?, ?, ?, ?)",
+            (self.session_id, user_input, response, intent, self._timestamps[-1])
+        )
+
+    def warmup_from_db(self, session_id: Optional[str] = None):
+        """
+        Rehydrate memory from the last interactions persisted for a session.
+
+        Rebuilds the in-memory deques, counters, and context in
+        O(memory_size) with no LLM calls.
+
+        Args:
+            session_id: Session to load (defaults to this instance's session)
+        """
+        session = session_id if session_id is not None else self.session_id
+        rows = self._db.execute(
+            "SELECT user_input, response, intent, ts FROM interactions "
+            "WHERE session = ? ORDER BY id DESC LIMIT ?",
+            (session, self._intents.maxlen)
+        ).fetchall()
+
+        if not rows:
+            return
+
+        for user_input, response, intent, ts in reversed(rows):
+            self._append_memory(user_input, response, intent, timestamp=ts)
+        logger.info(f"Rehydrated {len(rows)} interactions from session '{session}'")
+
+    async def process_input(self, user_input: str,
+                            on_token: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
+        """
+        Main method to process user input and return appropriate response.
+
+        Args:
+            user_input: The user's input text
+            on_token: Optional callback for incremental output - streamed
+                token-by-token when the intent is pre-resolved, or invoked
+                once with the full text on the combined structured-output
+                path (which cannot stream meaningfully)
+
+        Returns:
+            Dictionary containing user_input, intent, and response
+        """
+        if not user_input or not user_input.strip():
+            return {
+                'user_input': user_input,
+                'intent': 'unknown',
+                'response': 'Please provide a valid input.'
+            }
+        
+        user_input = user_input.strip()
+        
+        # Step 1: Try the fast pattern pre-classifier; fall back to the
+        # combined classify-and-respond call on ambiguity
+        logger.info(f"Processing input: {user_input[:50]}...")
+        intent = self._detect_intent(user_input)
+        if intent is not None:
+            response = await self._generate_response(user_input, intent, on_token=on_token)
+        else:
+            intent, response = await self._classify_and_respond(user_input)
+            if intent is not None:
+                self._cache_intent(user_input, intent)
+            else:
+                # Failed or untrusted classification: fall back to 'factual'
+                # for this turn only, without poisoning the cache
+                intent = 'factual'
+            if on_token is not None:
+                on_token(response)
+        logger.info(f"Detected intent: {intent}")
+
+        # Step 2: Store interaction in memory
+        self._store_interaction(user_input, response, intent)
+
+        # Step 3: Pre-classify likely follow-ups in the background
+        task = asyncio.create_task(self._prefetch_followups(user_input, response))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+
+
+        return {
+            'user_input': user_input,
+            'intent': intent,
+            'response': response
+        }
+
+    def get_memory_summary(self) -> List[Dict]:
+        """Get current memory state as a list of interaction dicts."""
+        return [
+            {
+                'id': interaction_id,
+                'user_input': user_input,
+                'response': response,
+                'context_snippet': context_snippet,
+                'intent': intent,
+                'timestamp': timestamp
+            }
+            for interaction_id, user_input, response, context_snippet, intent, timestamp
+            in zip(self._ids, self._inputs, self._responses,
+                   self._context_snippets, self._intents, self._timestamps)
+        ]
+
+    def clear_memory(self):
+        """Clear conversation memory."""
+        self._ids.clear()
+        self._inputs.clear()
+        self._responses.clear()
+        self._context_snippets.clear()
+        self._intents.clear()
+        self._timestamps.clear()
+        self._factual_count = 0
+        self._creative_count = 0
+        self._n = 0
+        self._context_lines.clear()
+        self._context_line_tokens.clear()
+        self._memory_version += 1
+        self._db.execute("DELETE FROM interactions WHERE session = ?", (self.session_id,))
+        logger.info("Memory cleared")
+
+    def get_memory_stats(self) -> Dict:
+        """Get statistics about memory usage."""
+        if self._n == 0:
+            return {'total_interactions': 0, 'factual_count': 0, 'creative_count': 0,
+                    'memory_capacity': self._intents.maxlen}
+
+        return {
+            'total_interactions': self._n,
+            'factual_count': self._factual_count,
+            'creative_count': self._creative_count,
+            'memory_capacity': self._intents.maxlen
+        }
+
+
+async def run_comprehensive_tests(use_batch: bool = False):
+    """
+    Run comprehensive test cases covering various scenarios.
+
+    Args:
+        use_batch: Submit the test inputs via the Batch API (half cost,
+            up to 24h turnaround) instead of live concurrent calls
+    """
+    print("=== AGENTIC LLM SYSTEM - COMPREHENSIVE TESTING ===\n")
+
+    # High-QPS dispatch: use the raw aiohttp transport for live calls
+    agent = AgenticLLM(use_raw_transport=True)
+    
+    test_cases = [
+        # === FACTUAL QUERIES ===
+        {
+            'category': 'Factual - Basic Facts',
+            'inputs': [
+                "Who is the CEO of Google?",
+                "What is the capital of France?",
+                "How many continents are there?",
+                "What year was Python programming language created?",
+                "What is the speed of light?"
+            ]
+        },
+        {
+            'category': 'Factual - Definitions',
+            'inputs': [
+                "What is machine learning?",
+                "Define photosynthesis",
+                "What does API stand for?",
+                "Explain what blockchain is"
+            ]
+        },
+        {
+            'category': 'Factual - Historical',
+            'inputs': [
+                "When did World War II end?",
+                "Who invented the telephone?",
+                "What year was the internet created?"
+            ]
+        },
+        
+        # === CREATIVE PROMPTS ===
+        {
+            'category': 'Creative - Captions & Descriptions',
+            'inputs': [
+                "Give me a caption for a futuristic city",
+                "Describe a magical forest in two sentences",
+                "Create a tagline for an eco-friendly coffee shop",
+                "Write a caption for a sunset over mountains"
+            ]
+        },
+        {
+            'category': 'Creative - Stories & Poems',
+            'inputs': [
+                "Write a short poem about rain",
+                "Create a story about a time-traveling cat",
+                "Write a haiku about technology",
+                "Tell me a story about a robot learning to paint"
+            ]
+        },
+        {
+            'category': 'Creative - Brainstorming',
+            'inputs': [
+                "Generate 3 names for a space exploration company",
+                "Create a concept for a mobile app that helps with meditation",
+                "Invent a new ice cream flavor and describe it"
+            ]
+        },
+        
+        # === EDGE CASES ===
+        {
+            'category': 'Edge Cases',
+            'inputs': [
+                "Hello",
+                "Help",
+                "?",
+                "What do you think about AI and creativity?",
+                "Can you both explain quantum physics and write a poem about it?"
+            ]
+        },
+        
+        # === MEMORY/CONTEXT TESTING ===
+        {
+            'category': 'Memory & Context Testing',
+            'inputs': [
+                "Tell me about Albert Einstein",
+                "What did he discover?",  # Should reference Einstein
+                "When was he born?",     # Should still reference Einstein
+                "Now tell me about Marie Curie",
+                "What was her most famous discovery?"  # Should reference Curie
+            ]
+        }
+    ]
+    
+    # Dispatch test inputs either through the Batch API or concurrently with
+    # a semaphore for rate control, then print results in the original order.
+    # The memory group's inputs are order-dependent follow-ups ("What did he
+    # discover?" needs the Einstein turn already in memory), so that group
+    # runs sequentially after the independent groups instead of racing them;
+    # this also makes the final memory state deterministic.
+    sequential_category = 'Memory & Context Testing'
+    flat_inputs = [test_input for group in test_cases for test_input in group['inputs']]
+
+    if use_batch:
+        results = iter(await agent.run_batch(flat_inputs))
+    else:
+        semaphore = asyncio.Semaphore(10)
+
+        async def run_one(test_input: str) -> Dict[str, str]:
+            async with semaphore:
+                return await agent.process_input(test_input)
+
+        independent = [test_input for group in test_cases
+                       if group['category'] != sequential_category
+                       for test_input in group['inputs']]
+        results_by_input = dict(zip(
+            independent,
+            await asyncio.gather(*(run_one(test_input) for test_input in independent))
+        ))
+
+        for group in test_cases:
+            if group['category'] == sequential_category:
+                for test_input in group['inputs']:
+                    results_by_input[test_input] = await agent.process_input(test_input)
+
+        results = iter(results_by_input[test_input] for test_input in flat_inputs)
+
+    for test_group in test_cases:
+        print(f"\n{'='*60}")
+        print(f"TESTING: {test_group['category']}")
+        print('='*60)
+
+        for i, test_input in enumerate(test_group['inputs'], 1):
+            print(f"\nTest {i}: {test_input}")
+            print("-" * 40)
+
+            result = next(results)
+            print(f"Intent: {result['intent'].upper()}")
+            print(f"Response: {result['response']}")
+
+    # Show final memory state and statistics
+    print(f"\n{'='*60}")
+    print("FINAL MEMORY STATE & STATISTICS")
+    print('='*60)
+    
+    stats = agent.get_memory_stats()
+    print(f"Memory Statistics:")
+    print(f"  Total interactions: {stats['total_interactions']}")
+    print(f"  Factual queries: {stats['factual_count']}")
+    print(f"  Creative prompts: {stats['creative_count']}")
+    print(f"  Memory capacity: {stats['memory_capacity']}")
+    
+    memory = agent.get_memory_summary()
+    print(f"\nLast {len(memory)} interactions in memory:")
+    for i, interaction in enumerate(memory, 1):
+        print(f"{i}. [{interaction['intent'].upper()}] {interaction['user_input']}")
+        print(f"   → {interaction['response'][:80]}{'...' if len(interaction['response']) > 80 else ''}")
+
+    await agent.aclose()
+
+
+async def interactive_mode():
+    """Run interactive mode for manual testing and demonstration."""
+    print("=== AGENTIC LLM SYSTEM - INTERACTIVE MODE ===")
+    print("Commands:")
+    print("  'exit' - Quit the program")
+    print("  'memory' - Show conversation history")
+    print("  'stats' - Show memory statistics")
+    print("  'clear' - Clear conversation memory")
+    print("  'help' - Show this help message")
+    print("\nStart chatting!\n")
+    
+    agent = AgenticLLM()
+    
+    while True:
+        try:
+            # Read input off the event loop so background prefetch work
+            # runs while the user types instead of after the next turn starts
+            user_input = (await asyncio.to_thread(input, "You: ")).strip()
+            
+            if user_input.lower() == 'exit':
+                print("Goodbye!")
+                break
+            elif user_input.lower() == 'memory':
+                memory = agent.get_memory_summary()
+                print(f"\n--- Conversation History ({len(memory)} interactions) ---")
+                if not memory:
+                    print("No interactions yet.")
+                else:
+                    for i, interaction in enumerate(memory, 1):
+                        print(f"{i}. You [{interaction['intent']}]: {interaction['user_input']}")
+                        print(f"   Assistant: {interaction['response'][:100]}{'...' if len(interaction['response']) > 100 else ''}")
+                print()
+                continue
+            elif user_input.lower() == 'stats':
+                stats = agent.get_memory_stats()
+                print(f"\n--- Memory Statistics ---")
+                print(f"Total interactions: {stats['total_interactions']}")
+                print(f"Factual queries: {stats['factual_count']}")
+                print(f"Creative prompts: {stats['creative_count']}")
+                print(f"Memory capacity: {stats['memory_capacity']}")
+                print()
+                continue
+            elif user_input.lower() == 'clear':
+                agent.clear_memory()
+                print("Conversation memory cleared.\n")
+                continue
+            elif user_input.lower() == 'help':
+                print("\nCommands:")
+                print("  'exit' - Quit the program")
+                print("  'memory' - Show conversation history")
+                print("  'stats' - Show memory statistics")
+                print("  'clear' - Clear conversation memory")
+                print("  'help' - Show this help message\n")
+                continue
+            elif not user_input:
+                continue
+            
+            # Process the input, streaming tokens to the terminal as they arrive
+            print("Agent: ", end="", flush=True)
+            result = await agent.process_input(
+                user_input,
+                on_token=lambda token: print(token, end="", flush=True)
+            )
+            print(f"\n[intent: {result['intent']}]\n")
+            
+        except KeyboardInterrupt:
+            print("\n\nGoodbye!")
+            break
+        except Exception as e:
+            print(f"Error: {e}")
+
+
+async def quick_demo():
+    """Run a short demo over a handful of representative inputs."""
+    print("\n=== QUICK DEMO ===")
+    agent = AgenticLLM()
+
+    demo_inputs = [
+        "Who is the CEO of Google?",
+        "Give me a caption for a futuristic city",
+        "What's the largest planet in our solar system?",
+        "Write a short poem about coding"
+    ]
+
+    for inp in demo_inputs:
+        print(f"\nUser: {inp}")
+        result = await agent.process_input(inp)
+        print(f"Agent [{result['intent']}]: {result['response']}")
+
+
+if __name__ == "__main__":
+    # Verify OpenAI API key
+    load_dotenv()
+    if not os.getenv('OPENAI_API_KEY'):
+        print("❌ Error: OPENAI_API_KEY not found in environment variables.")
+        print("Please add your OpenAI API key to a .env file:")
+        print("OPENAI_API_KEY=your_api_key_here")
+        exit(1)
+    
+    print("🤖 AGENTIC LLM SYSTEM")
+    print("Choose a mode:")
+    print("1. Run comprehensive automated tests")
+    print("2. Interactive mode (chat with the agent)")
+    print("3. Quick demo")
+    
+    choice = input("\nEnter your choice (1, 2, or 3): ").strip()
+
+    # Pass --batch to route the comprehensive tests through the Batch API
+    use_batch = '--batch' in sys.argv
+
+    if choice == '1':
+        asyncio.run(run_comprehensive_tests(use_batch=use_batch))
+    elif choice == '2':
+        asyncio.run(interactive_mode())
+    elif choice == '3':
+        asyncio.run(quick_demo())
+    else:
+        print("Invalid choice. Running comprehensive tests by default.")
+        asyncio.run(run_comprehensive_tests(use_batch=use_batch))
\ No newline at end of file